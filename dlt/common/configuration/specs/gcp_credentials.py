@@ -1,4 +1,5 @@
 import dataclasses
+import os
 import sys
 from typing import Any, ClassVar, Final, List, Tuple, Union, Dict, Optional
 
@@ -250,9 +251,25 @@ class GcpOAuthCredentialsWithoutDefaults(GcpCredentials, OAuth2Credentials):
         return f"{self.client_id}@{self.project_id}"
 
 
+DEFAULT_CREDENTIALS_ENV_VARS = (
+    "GOOGLE_APPLICATION_CREDENTIALS",
+    "GOOGLE_CLOUD_PROJECT",
+    "GCLOUD_PROJECT",
+    "CLOUDSDK_CONFIG",
+)
+"""Environment variables that google.auth.default uses to find credentials and project id"""
+
+
 @configspec
 class GcpDefaultCredentials(CredentialsWithDefault, GcpCredentials):
     _LAST_FAILED_DEFAULT: ClassVar[float] = 0.0
+    _LAST_FOUND_DEFAULT: ClassVar[Tuple[float, Tuple[Optional[str], ...], Any, str]] = (
+        0.0,
+        (),
+        None,
+        None,
+    )
+    """Time, DEFAULT_CREDENTIALS_ENV_VARS values, credentials and project id found last time"""
 
     def parse_native_representation(self, native_value: Any) -> None:
         """Accepts google credentials as native value"""
@@ -272,20 +289,36 @@ class GcpDefaultCredentials(CredentialsWithDefault, GcpCredentials):
         )
 
     @staticmethod
-    def _get_default_credentials(retry_timeout_s: float = 600.0) -> Tuple[Any, str]:
+    def _get_default_credentials(
+        retry_timeout_s: float = 600.0, cache_ttl_s: float = 60.0
+    ) -> Tuple[Any, str]:
         now = pendulum.now().timestamp()
         if now - GcpDefaultCredentials._LAST_FAILED_DEFAULT < retry_timeout_s:
             return None, None
+        # google.auth.default reads files and may probe metadata server so reuse recent result
+        # as long as environment variables it depends on did not change
+        env_values = tuple(os.environ.get(env_var) for env_var in DEFAULT_CREDENTIALS_ENV_VARS)
+        found_at, found_env_values, credentials, project_id = (
+            GcpDefaultCredentials._LAST_FOUND_DEFAULT
+        )
+        if (
+            credentials is not None
+            and found_env_values == env_values
+            and now - found_at < cache_ttl_s
+        ):
+            return credentials, project_id
 
         from google.auth import default as default_credentials
         from google.auth.exceptions import DefaultCredentialsError
 
         try:
-            return default_credentials()  # type: ignore
+            credentials, project_id = default_credentials()
         except DefaultCredentialsError:
             # prevent exception
             GcpDefaultCredentials._LAST_FAILED_DEFAULT = now
             return None, None
+        GcpDefaultCredentials._LAST_FOUND_DEFAULT = (now, env_values, credentials, project_id)
+        return credentials, project_id
 
     def on_partial(self) -> None:
         """Looks for default google credentials and resolves configuration if found. Otherwise continues as partial"""
@@ -1,5 +1,6 @@
 import os
 import pathlib
+from functools import lru_cache
 from typing import Any, Literal, Optional, Type, get_args, ClassVar, Dict, Union
 from urllib.parse import urlparse, unquote
 
@@ -88,10 +89,7 @@ class FilesystemConfiguration(BaseConfiguration):
     @property
     def protocol(self) -> str:
         """`bucket_url` protocol"""
-        if self.is_local_path(self.bucket_url):
-            return "file"
-        else:
-            return urlparse(self.bucket_url).scheme
+        return self.protocol_from_url(self.bucket_url)
 
     def on_resolved(self) -> None:
         uri = urlparse(self.bucket_url)
@@ -107,8 +105,14 @@ class FilesystemConfiguration(BaseConfiguration):
 
     @resolve_type("credentials")
     def resolve_credentials_type(self) -> Type[CredentialsConfiguration]:
-        # use known credentials or empty credentials for unknown protocol
-        return self.PROTOCOL_CREDENTIALS.get(self.protocol) or Optional[CredentialsConfiguration]  # type: ignore[return-value]
+        return self.credentials_type_for_protocol(self.protocol)
+
+    @classmethod
+    def credentials_type_for_protocol(cls, protocol: str) -> Type[CredentialsConfiguration]:
+        """Returns credentials type for `protocol`. Protocols without known credentials (ie. file, memory)
+        get empty, optional credentials
+        """
+        return cls.PROTOCOL_CREDENTIALS.get(protocol) or Optional[CredentialsConfiguration]  # type: ignore[return-value]
 
     def fingerprint(self) -> str:
         """Returns a fingerprint of bucket schema and netloc.
@@ -136,6 +140,15 @@ class FilesystemConfiguration(BaseConfiguration):
             return uri._replace(netloc=new_netloc).geturl()
         return self.bucket_url
 
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def protocol_from_url(bucket_url: str) -> str:
+        """Extracts protocol from `bucket_url`, "file" for local paths. Cached as `protocol` is accessed often"""
+        if FilesystemConfiguration.is_local_path(bucket_url):
+            return "file"
+        else:
+            return urlparse(bucket_url).scheme
+
     @staticmethod
     def is_local_path(uri: str) -> bool:
         """Checks if `uri` is a local path, without a schema"""
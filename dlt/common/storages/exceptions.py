@@ -1,5 +1,5 @@
 import semver
-from typing import Iterable
+from typing import Iterable, Optional
 
 from dlt.common.exceptions import DltException, TerminalValueError
 
@@ -138,3 +138,25 @@ class CurrentLoadPackageStateNotAvailable(StorageException):
             "State of the current load package is not available. Current load package state is"
             " only available in a function decorated with @dlt.destination during loading."
         )
+
+
+class WriteCorruptionException(StorageException):
+    def __init__(self, file_path: str, expected_sha256: str, actual_sha256: str) -> None:
+        self.file_path = file_path
+        self.expected_sha256 = expected_sha256
+        self.actual_sha256 = actual_sha256
+        super().__init__(
+            f"Content written to {file_path} is corrupted: expected sha256 {expected_sha256} but"
+            f" read back {actual_sha256}"
+        )
+
+
+class PreviousContentMismatchException(StorageException):
+    def __init__(self, file_path: str, expected_sha256: str, actual_sha256: Optional[str]) -> None:
+        self.file_path = file_path
+        self.expected_sha256 = expected_sha256
+        self.actual_sha256 = actual_sha256
+        super().__init__(
+            f"File {file_path} has unexpected content: expected previous content with sha256"
+            f" {expected_sha256} but found {actual_sha256}"
+        )
@@ -1,48 +1,309 @@
+import ctypes
 import gzip
+import hashlib
 import os
 import re
 import stat
+import sys
 import errno
 import tempfile
 import shutil
 import pathvalidate
-from typing import IO, Any, Optional, List, cast
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate
+from typing import IO, Any, ClassVar, Iterable, Iterator, Optional, List, Tuple, cast
 from dlt.common.typing import AnyFun
 
+from dlt.common.storages.exceptions import (
+    PreviousContentMismatchException,
+    WriteCorruptionException,
+)
 from dlt.common.utils import encoding_for_mode, uniq_id
 
+if sys.platform != "win32":
+    import fcntl
+
 
 FILE_COMPONENT_INVALID_CHARACTERS = re.compile(r"[.%{}]")
+# characters banned by Universal platform in pathvalidate: control characters and \ / : * ? " < > |
+# plus the ones in FILE_COMPONENT_INVALID_CHARACTERS, leading and trailing spaces
+_FILE_COMPONENT_INVALID = re.compile(r'[\x00-\x1f\x7f\\/:*?"<>|.%{}]|^ | $')
+_FILE_COMPONENT_RESERVED_NAMES = frozenset(
+    ("CON", "PRN", "AUX", "CLOCK$", "NUL")
+    + tuple(f"{name}{num}" for name in ("COM", "LPT") for num in "0123456789\u00b9\u00b2\u00b3")
+)
+# first characters of absolute paths on all platforms
+_PATH_ROOT_CHARS = ("/", "\\")
+HASH_READ_CHUNK_SIZE = 1 << 20
+TMPFILE_MAX_SIZE = 8 * 1024
+"""Max size of data written via anonymous temp file (O_TMPFILE) in save_atomic"""
+SAVE_MANY_MAX_WORKERS = 8
+LOAD_CHUNK_SIZE = 1 << 20
+# renameat2 arguments, see linux/fcntl.h and linux/fs.h
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+# folders in rmtree are opened without following symlinks
+_RMTREE_OPEN_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+# reflink ioctl, _IOW(0x94, 9, int) in linux/fs.h
+_FICLONE = 0x40049409
+
+
+@lru_cache(maxsize=None)
+def _libc_renameat2() -> Optional[Any]:
+    """Binds renameat2 from libc (glibc 2.28+), None if not available"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    renameat2.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint,
+    ]
+    renameat2.restype = ctypes.c_int
+    return renameat2
 
 
 class FileStorage:
+    # disabled on first failure ie. when file system does not support O_TMPFILE or /proc links
+    _use_o_tmpfile: ClassVar[bool] = hasattr(os, "O_TMPFILE")
+    # disabled when kernel or file system does not support RENAME_EXCHANGE
+    _use_rename_exchange: ClassVar[bool] = sys.platform.startswith("linux")
+    # disabled when file system does not support reflinks (FICLONE)
+    _use_reflink: ClassVar[bool] = sys.platform.startswith("linux")
+
     def __init__(self, storage_path: str, file_type: str = "t", makedirs: bool = False) -> None:
         # make it absolute path
         self.storage_path = os.path.realpath(storage_path)
+        # prefix of all paths below storage root
+        self._storage_prefix = os.path.join(self.storage_path, "")
         self.file_type = file_type
+        # encoding used when open mode does not specify file type
+        self._file_type_encoding = encoding_for_mode(file_type)
         if makedirs:
             os.makedirs(storage_path, exist_ok=True)
 
-    def save(self, relative_path: str, data: Any) -> str:
-        return self.save_atomic(self.storage_path, relative_path, data, file_type=self.file_type)
+    def save(self, relative_path: str, data: Any, durable: bool = True) -> str:
+        return self.save_atomic(
+            self.storage_path, relative_path, data, file_type=self.file_type, durable=durable
+        )
+
+    def save_many(self, items: Iterable[Tuple[str, Any]], durable: bool = True) -> List[str]:
+        """Saves many files like `save`, writing them in parallel in a thread pool.
+
+        Writes and fsyncs release GIL so batches of small files are not written one by one. Returns
+        full paths in the order of `items`. If any write fails, the first exception (in `items` order)
+        is raised after all writes completed.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [
+                self.save_atomic(self.storage_path, path, data, self.file_type, durable)
+                for path, data in items
+            ]
+        with ThreadPoolExecutor(
+            max_workers=min(SAVE_MANY_MAX_WORKERS, len(items)), thread_name_prefix="file_storage"
+        ) as pool:
+            futures = [
+                pool.submit(
+                    self.save_atomic, self.storage_path, path, data, self.file_type, durable
+                )
+                for path, data in items
+            ]
+        return [future.result() for future in futures]
 
     @staticmethod
-    def save_atomic(storage_path: str, relative_path: str, data: Any, file_type: str = "t") -> str:
+    def save_atomic(
+        storage_path: str,
+        relative_path: str,
+        data: Any,
+        file_type: str = "t",
+        durable: bool = True,
+        verify: bool = False,
+        expected_prev_sha256: Optional[str] = None,
+        exchange: bool = False,
+    ) -> str:
+        """Atomically writes `data` to `relative_path` in `storage_path` via a temp file and rename.
+
+        When `durable` is set, temp file content is fsynced before the rename and the parent
+        folder is fsynced after it so a crash cannot leave an empty or truncated file. Set to False
+        on bulk write paths where throughput matters more than power loss resilience.
+
+        When `verify` is set, the temp file is read back and its sha256 compared with `data` before
+        the rename, `WriteCorruptionException` is raised on mismatch. `expected_prev_sha256` makes the
+        write conditional: `PreviousContentMismatchException` is raised if the current destination
+        file is missing or its content has a different sha256. This check is best effort: it is not
+        atomic with the rename and a write that lands between them is overwritten. Writers that
+        must not lose updates need their own lock.
+
+        With `exchange` (Linux only) existing destination file is atomically swapped with the temp file
+        (renameat2 with RENAME_EXCHANGE) and deleted after the swap, so removing the previous inode
+        is not part of the rename. Falls back to regular replace where not supported.
+        """
         mode = "w" + file_type
-        with tempfile.NamedTemporaryFile(
-            dir=storage_path, mode=mode, delete=False, encoding=encoding_for_mode(mode)
-        ) as f:
-            tmp_path = f.name
-            f.write(data)
+        encoding = encoding_for_mode(mode)
+        dest_path = os.path.join(storage_path, relative_path)
+        if expected_prev_sha256 is not None:
+            # not atomic with the rename below, see docstring
+            try:
+                prev_sha256 = FileStorage.file_sha256(dest_path)
+            except FileNotFoundError:
+                prev_sha256 = None
+            if prev_sha256 != expected_prev_sha256:
+                raise PreviousContentMismatchException(dest_path, expected_prev_sha256, prev_sha256)
+        tmp_path: Optional[str] = None
+        if (
+            expected_prev_sha256 is None
+            and FileStorage._use_o_tmpfile
+            and not verify
+            and len(data) <= TMPFILE_MAX_SIZE
+        ):
+            tmp_path = FileStorage._save_atomic_tmpfile(dest_path, data, encoding, durable)
+            if tmp_path == dest_path:
+                return dest_path
+        if tmp_path is None:
+            with tempfile.NamedTemporaryFile(
+                dir=storage_path, mode=mode, delete=False, encoding=encoding
+            ) as f:
+                tmp_path = f.name
+                f.write(data)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
         try:
-            dest_path = os.path.join(storage_path, relative_path)
-            # os.rename reverts to os.replace on posix. on windows this operation is not atomic!
-            os.replace(tmp_path, dest_path)
-            return dest_path
+            if verify:
+                if encoding is not None:
+                    # text mode translates new lines on write
+                    if os.linesep != "\n":
+                        data = data.replace("\n", os.linesep)
+                    data = data.encode(encoding)
+                expected_sha256 = hashlib.sha256(data).hexdigest()
+                actual_sha256 = FileStorage.file_sha256(tmp_path)
+                if actual_sha256 != expected_sha256:
+                    raise WriteCorruptionException(dest_path, expected_sha256, actual_sha256)
+            exchanged = exchange and FileStorage._rename_exchange(tmp_path, dest_path)
+            if not exchanged:
+                # os.rename reverts to os.replace on posix. on windows this operation is not atomic!
+                os.replace(tmp_path, dest_path)
         except Exception:
             if os.path.isfile(tmp_path):
                 os.remove(tmp_path)
             raise
+        if durable:
+            FileStorage.fsync_folder(os.path.dirname(dest_path))
+        if exchanged:
+            # temp file holds previous content now
+            os.unlink(tmp_path)
+        return dest_path
+
+    @staticmethod
+    def _rename_exchange(source_path: str, dest_path: str) -> bool:
+        """Atomically swaps `source_path` and `dest_path` with renameat2(RENAME_EXCHANGE).
+
+        Returns False if swap is not supported or `dest_path` is not an existing regular file and
+        regular rename must be used.
+        """
+        if not FileStorage._use_rename_exchange:
+            return False
+        # RENAME_EXCHANGE swaps files with folders, os.replace refuses to overwrite a folder
+        try:
+            if not stat.S_ISREG(os.lstat(dest_path).st_mode):
+                return False
+        except FileNotFoundError:
+            return False
+        renameat2 = _libc_renameat2()
+        if renameat2 is None:
+            FileStorage._use_rename_exchange = False
+            return False
+        if (
+            renameat2(
+                _AT_FDCWD,
+                os.fsencode(source_path),
+                _AT_FDCWD,
+                os.fsencode(dest_path),
+                _RENAME_EXCHANGE,
+            )
+            == 0
+        ):
+            return True
+        err = ctypes.get_errno()
+        if err == errno.ENOENT:
+            return False
+        if err in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+            FileStorage._use_rename_exchange = False
+            return False
+        raise OSError(err, os.strerror(err), source_path, None, dest_path)
+
+    @staticmethod
+    def _save_atomic_tmpfile(
+        dest_path: str, data: Any, encoding: Optional[str], durable: bool
+    ) -> Optional[str]:
+        """Writes small `data` to `dest_path` via anonymous temp file (Linux O_TMPFILE).
+
+        The file gets a name only when linked, no named temp file is written. If `dest_path` does
+        not exist the file is linked there and `dest_path` is returned. Otherwise the file is linked
+        under a temp name in the same folder that is returned, so it can replace `dest_path`.
+        Returns None if O_TMPFILE is not supported and regular temp file must be used.
+        """
+        dest_folder = os.path.dirname(dest_path)
+        if encoding is not None:
+            data = data.encode(encoding)
+        try:
+            fd = os.open(dest_folder, os.O_TMPFILE | os.O_WRONLY, 0o600)
+        except OSError as ex:
+            if ex.errno in (errno.EOPNOTSUPP, errno.EISDIR, errno.EINVAL):
+                FileStorage._use_o_tmpfile = False
+                return None
+            raise
+        fd_path = f"/proc/self/fd/{fd}"
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+            if durable:
+                os.fsync(fd)
+            try:
+                os.link(fd_path, dest_path, follow_symlinks=True)
+            except FileExistsError:
+                tmp_path = os.path.join(dest_folder, uniq_id())
+                os.link(fd_path, tmp_path, follow_symlinks=True)
+                return tmp_path
+        except OSError as ex:
+            # /proc not mounted or links from it not permitted
+            if ex.errno in (errno.ENOENT, errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP):
+                FileStorage._use_o_tmpfile = False
+                return None
+            raise
+        finally:
+            os.close(fd)
+        if durable:
+            FileStorage.fsync_folder(dest_folder)
+        return dest_path
+
+    @staticmethod
+    def file_sha256(file_path: str) -> str:
+        """Computes sha256 hex digest of file content, reading it in chunks"""
+        h = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(HASH_READ_CHUNK_SIZE):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def fsync_folder(folder_path: str) -> None:
+        """Persists folder entries (ie. after rename). No-op on platforms that cannot open folders"""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        dir_fd = os.open(folder_path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
     @staticmethod
     def move_atomic_to_folder(source_file_path: str, dest_folder_path: str) -> str:
@@ -86,40 +347,67 @@ class FileStorage:
         with self.open_file(relative_path) as text_file:
             return text_file.read()
 
+    def load_iter(self, relative_path: str, chunk_size: int = LOAD_CHUNK_SIZE) -> Iterator[Any]:
+        """Yields content of the file in chunks of up to `chunk_size` characters (or bytes in binary
+        storage) so large files are never fully loaded in memory. To process line oriented data,
+        iterate over the file object from `open_file` instead.
+        """
+        with self.open_file(relative_path) as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
     def delete(self, relative_path: str) -> None:
         file_path = self.make_full_path(relative_path)
-        if os.path.isfile(file_path):
+        try:
             os.remove(file_path)
-        else:
-            raise FileNotFoundError(file_path)
+        except OSError:
+            # error raised for folders is platform specific
+            if os.path.isdir(file_path):
+                raise FileNotFoundError(file_path)
+            raise
 
     def delete_folder(
         self, relative_path: str, recursively: bool = False, delete_ro: bool = False
     ) -> None:
         folder_path = self.make_full_path(relative_path)
-        if os.path.isdir(folder_path):
-            if recursively:
-                if delete_ro:
-                    del_ro = self.rmtree_del_ro
-                else:
-                    del_ro = None
-                shutil.rmtree(folder_path, onerror=del_ro)
+        if recursively:
+            if delete_ro:
+                del_ro = self.rmtree_del_ro
             else:
-                os.rmdir(folder_path)
+                del_ro = None
+            try:
+                self.rmtree(folder_path, onerror=del_ro)
+            except FileNotFoundError as ex:
+                if ex.filename != folder_path:
+                    raise
+                raise NotADirectoryError(folder_path)
         else:
-            raise NotADirectoryError(folder_path)
+            try:
+                os.rmdir(folder_path)
+            except FileNotFoundError:
+                raise NotADirectoryError(folder_path)
 
     def open_file(self, relative_path: str, mode: str = "r") -> IO[Any]:
         if "b" not in mode and "t" not in mode:
             mode = mode + self.file_type
+            encoding = self._file_type_encoding
+        else:
+            encoding = encoding_for_mode(mode)
         if "r" in mode:
-            return FileStorage.open_zipsafe_ro(self.make_full_path(relative_path), mode)
-        return open(self.make_full_path(relative_path), mode, encoding=encoding_for_mode(mode))
+            return FileStorage.open_zipsafe_ro(
+                self.make_full_path(relative_path), mode, encoding=encoding
+            )
+        return open(self.make_full_path(relative_path), mode, encoding=encoding)
 
     def open_temp(self, delete: bool = False, mode: str = "w", file_type: str = None) -> IO[Any]:
-        mode = mode + file_type or self.file_type
+        if file_type is None:
+            mode = mode + self.file_type
+            encoding = self._file_type_encoding
+        else:
+            mode = mode + file_type
+            encoding = encoding_for_mode(mode)
         return tempfile.NamedTemporaryFile(
-            dir=self.storage_path, mode=mode, delete=delete, encoding=encoding_for_mode(mode)
+            dir=self.storage_path, mode=mode, delete=delete, encoding=encoding
         )
 
     def has_file(self, relative_path: str) -> bool:
@@ -139,26 +427,27 @@ class FileStorage:
             List[str]: A list of file names with optional path as per ``to_root`` parameter
         """
         scan_path = self.make_full_path(relative_path)
-        if to_root:
-            # list files in relative path, returning paths relative to storage root
-            return [
-                os.path.join(relative_path, e.name) for e in os.scandir(scan_path) if e.is_file()
-            ]
-        else:
-            # or to the folder
-            return [e.name for e in os.scandir(scan_path) if e.is_file()]
+        with os.scandir(scan_path) as entries:
+            if to_root:
+                # list files in relative path, returning paths relative to storage root
+                # join the folder prefix once, equivalent to os.path.join on each file
+                prefix = os.path.join(relative_path, "")
+                return [prefix + e.name for e in entries if e.is_file()]
+            else:
+                # or to the folder
+                return [e.name for e in entries if e.is_file()]
 
     def list_folder_dirs(self, relative_path: str, to_root: bool = True) -> List[str]:
         # list content of relative path, returning paths relative to storage root
         scan_path = self.make_full_path(relative_path)
-        if to_root:
-            # list folders in relative path, returning paths relative to storage root
-            return [
-                os.path.join(relative_path, e.name) for e in os.scandir(scan_path) if e.is_dir()
-            ]
-        else:
-            # or to the folder
-            return [e.name for e in os.scandir(scan_path) if e.is_dir()]
+        with os.scandir(scan_path) as entries:
+            if to_root:
+                # list folders in relative path, returning paths relative to storage root
+                prefix = os.path.join(relative_path, "")
+                return [prefix + e.name for e in entries if e.is_dir()]
+            else:
+                # or to the folder
+                return [e.name for e in entries if e.is_dir()]
 
     def create_folder(self, relative_path: str, exists_ok: bool = False) -> None:
         os.makedirs(self.make_full_path(relative_path), exist_ok=exists_ok)
@@ -176,6 +465,38 @@ class FileStorage:
             # Fallback to copy when fs doesn't support links or attempting to make a cross-device link
             FileStorage.copy_atomic_to_file(external_file_path, to_file_path)
 
+    def clone_hard(self, from_relative_path: str, to_relative_path: str) -> None:
+        """Clones a file within storage, see `clone_or_link`"""
+        FileStorage.clone_or_link(
+            self.make_full_path(from_relative_path), self.make_full_path(to_relative_path)
+        )
+
+    @staticmethod
+    def clone_or_link(external_file_path: str, to_file_path: str) -> None:
+        """Creates a reflink (copy on write clone) of a file, falls back to hardlink and then to copy.
+
+        Reflinks are metadata only operations on file systems that support them (Linux btrfs, xfs)
+        and, unlike hardlinks, create an independent file. Hardlinks and copies are used when
+        file system does not support reflinks or files are on different devices.
+        """
+        if sys.platform != "win32" and FileStorage._use_reflink:
+            try:
+                with open(external_file_path, "rb") as src:
+                    # do not clobber existing destination, fallbacks below decide what to do
+                    with open(to_file_path, "xb") as dst:
+                        try:
+                            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+                            return
+                        except OSError as ex:
+                            # EXDEV is specific to this pair of files, fall back only for this call
+                            if ex.errno in (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOTTY):
+                                FileStorage._use_reflink = False
+                    # reflinks not supported, remove empty destination file
+                    os.unlink(to_file_path)
+            except OSError:
+                pass
+        FileStorage.link_hard_with_fallback(external_file_path, to_file_path)
+
     def atomic_rename(self, from_relative_path: str, to_relative_path: str) -> None:
         """Renames a path using os.rename which is atomic on POSIX, Windows and NFS v4.
 
@@ -246,33 +567,71 @@ class FileStorage:
     def is_path_in_storage(self, path: str) -> bool:
         """Checks if a given path is below storage root, without checking for item existence"""
         assert path is not None
+        return self._resolve(path)[1]
+
+    def _resolve(self, path: str) -> Tuple[str, bool]:
+        """Resolves `path` relative to storage root once. Returns normalized absolute path and
+        a flag if it is below storage root
+        """
         # all paths are relative to root
         if not os.path.isabs(path):
             path = os.path.join(self.storage_path, path)
-        file = os.path.realpath(path)
-        # return true, if the common prefix of both is equal to directory
-        # e.g. /a/b/c/d.rst and directory is /a/b, the common prefix is /a/b
-        return os.path.commonprefix([file, self.storage_path]) == self.storage_path
+        file = self._resolve_path(path)
+        return file, self._is_below_root(file)
+
+    def _resolve_path(self, path: str) -> str:
+        """Normalizes absolute `path` like `os.path.realpath` but without resolving each component.
+
+        Falls back to `os.path.realpath` if normalized path is outside of storage root, refers to
+        parent folders or contains symlinks below storage root. Storage root is resolved on init.
+        """
+        if os.pardir in path:
+            return os.path.realpath(path)
+        file = os.path.abspath(path)
+        if file == self.storage_path:
+            return file
+        if not file.startswith(self._storage_prefix):
+            return os.path.realpath(path)
+        # only components below storage root may be symlinks, accumulate them from the root:
+        # "<root>/a", "<root>/a/b", "<root>/a/b/c"
+        names = file[len(self._storage_prefix) :].split(os.sep)
+        names[0] = self._storage_prefix + names[0]
+        for component in accumulate(names, os.path.join):
+            try:
+                if stat.S_ISLNK(os.lstat(component).st_mode):
+                    return os.path.realpath(path)
+            except OSError:
+                # non existing components are not resolved
+                break
+        return file
+
+    def _is_below_root(self, file: str) -> bool:
+        # compare whole path components: /a/bc is not below /a/b
+        return file == self.storage_path or file.startswith(self._storage_prefix)
 
     def to_relative_path(self, path: str) -> str:
         if path == "":
             return ""
-        if not self.is_path_in_storage(path):
+        file, is_in_storage = self._resolve(path)
+        if not is_in_storage:
             raise ValueError(path)
-        if not os.path.isabs(path):
-            path = os.path.realpath(os.path.join(self.storage_path, path))
-        # for abs paths find the relative
-        return os.path.relpath(path, start=self.storage_path)
+        if file == self.storage_path:
+            return os.curdir
+        # normalized path below root, strip the root prefix
+        return file[len(self._storage_prefix) :]
 
     def make_full_path_safe(self, path: str) -> str:
         """Verifies that path is under storage root and then returns normalized absolute path"""
-        # try to make a relative path if paths are absolute or overlapping
-        path = self.to_relative_path(path)
-        # then assume that it is a path relative to storage root
-        return os.path.realpath(os.path.join(self.storage_path, path))
+        file, is_in_storage = self._resolve(path)
+        if not is_in_storage:
+            raise ValueError(path)
+        return file
 
     def make_full_path(self, path: str) -> str:
         """Joins path with storage root. Intended for path known to be relative to storage root"""
+        # relative paths without drive are simply appended, same as os.path.join does
+        if path and path[0] not in _PATH_ROOT_CHARS and path[1:2] != ":":
+            return self._storage_prefix + path
         return os.path.join(self.storage_path, path)
 
     def from_wd_to_relative_path(self, wd_relative_path: str) -> str:
@@ -288,18 +647,99 @@ class FileStorage:
 
     @staticmethod
     def validate_file_name_component(name: str) -> None:
+        """Validates that `name` is a file name on all platforms (pathvalidate Universal) that in
+        addition does not contain . % { } characters. Name length is not checked.
+        """
+        if not name or name.isspace():
+            raise pathvalidate.ValidationError(reason=pathvalidate.ErrorReason.NULL_NAME)
         # Universal platform bans several characters allowed in POSIX ie. | < \ or "COM1" :)
-        try:
-            pathvalidate.validate_filename(name, platform="Universal")
-        except pathvalidate.error.ValidationError as val_ex:
-            if val_ex.reason != pathvalidate.ErrorReason.INVALID_LENGTH:
-                raise
-        # component cannot contain "."
-        if FILE_COMPONENT_INVALID_CHARACTERS.search(name):
-            raise pathvalidate.error.InvalidCharError(
-                description="Component name cannot contain the following characters: . % { }"
+        if name.upper() in _FILE_COMPONENT_RESERVED_NAMES:
+            raise pathvalidate.ReservedNameError(
+                f"'{name}' is a reserved name", reusable_name=False, reserved_name=name
+            )
+        if match := _FILE_COMPONENT_INVALID.search(name):
+            raise pathvalidate.InvalidCharError(
+                description=(
+                    f"Component name contains invalid character {match.group()!r}. Component name"
+                    " cannot contain the following characters: . % { }, control characters or"
+                    " characters not allowed in file names on any platform and cannot start or"
+                    " end with a space"
+                )
             )
 
+    @staticmethod
+    def rmtree(path: str, onerror: Optional[AnyFun] = None) -> None:
+        """Deletes folder tree at `path` like `shutil.rmtree` with the same `onerror` handler.
+
+        Where `shutil.rmtree` is resistant to symlink attacks (ie. on Linux), tree is traversed
+        iteratively with os.scandir on folder descriptors and entry types are taken from the
+        folder listing so no stat is done per entry. Folders are opened relative to their parents
+        without following symlinks so a folder replaced with a symlink during the walk is never
+        descended into. Symlinks are removed, not followed.
+        """
+        path_stat = os.lstat(path)
+        if stat.S_ISLNK(path_stat.st_mode):
+            raise OSError(f"Cannot call rmtree on a symbolic link: {path}")
+        if not stat.S_ISDIR(path_stat.st_mode):
+            raise NotADirectoryError(path)
+        if not shutil.rmtree.avoids_symlink_attacks:
+            shutil.rmtree(path, onerror=onerror)
+            return
+
+        def _remove(action: AnyFun, name: str, full_path: str, dir_fd: Optional[int]) -> None:
+            try:
+                action(name, dir_fd=dir_fd)
+            except OSError:
+                if onerror is None:
+                    raise
+                onerror(action, full_path, sys.exc_info())
+
+        def _open(name: str, full_path: str, dir_fd: Optional[int]) -> Optional[Tuple[int, Any]]:
+            try:
+                fd = os.open(name, _RMTREE_OPEN_FLAGS, dir_fd=dir_fd)
+            except OSError:
+                if onerror is None:
+                    raise
+                onerror(os.open, full_path, sys.exc_info())
+                return None
+            try:
+                # list whole folder before it is modified, readdir is not guaranteed to be
+                # consistent when entries are removed during iteration
+                with os.scandir(fd) as scandir_it:
+                    return fd, list(scandir_it)
+            except OSError:
+                os.close(fd)
+                if onerror is None:
+                    raise
+                onerror(os.scandir, full_path, sys.exc_info())
+                return None
+
+        root = _open(path, path, None)
+        if root is None:
+            return
+        # folders opened from root to the one being removed: name, full path, fd, pending entries
+        stack: List[Tuple[str, str, int, List[os.DirEntry[str]]]] = [(path, path, *root)]
+        try:
+            while stack:
+                _, folder, fd, entries = stack[-1]
+                if entries:
+                    entry = entries.pop()
+                    entry_path = os.path.join(folder, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        opened = _open(entry.name, entry_path, fd)
+                        if opened is not None:
+                            stack.append((entry.name, entry_path, *opened))
+                    else:
+                        _remove(os.unlink, entry.name, entry_path, fd)
+                else:
+                    # all entries removed, remove the folder itself
+                    name, folder, fd, _ = stack.pop()
+                    os.close(fd)
+                    _remove(os.rmdir, name, folder, stack[-1][2] if stack else None)
+        finally:
+            for _, _, fd, _ in stack:
+                os.close(fd)
+
     @staticmethod
     def rmtree_del_ro(action: AnyFun, name: str, exc: Any) -> Any:
         if action is os.unlink or action is os.remove or action is os.rmdir:
@@ -313,7 +753,7 @@ class FileStorage:
     def open_zipsafe_ro(path: str, mode: str = "r", **kwargs: Any) -> IO[Any]:
         """Opens a file using gzip.open if it is a gzip file, otherwise uses open."""
         assert "r" in mode, "FileStorage.open_zipsafe_ro only supports read modes"
-        encoding = kwargs.pop("encoding", encoding_for_mode(mode))
+        encoding = kwargs.pop("encoding") if "encoding" in kwargs else encoding_for_mode(mode)
         origmode = str(mode)
         try:
             if encoding is not None and mode == "r":
@@ -25,11 +25,8 @@ class FilesystemDestinationClientConfiguration(FilesystemConfiguration, Destinat
 
     @resolve_type("credentials")
     def resolve_credentials_type(self) -> Type[CredentialsConfiguration]:
-        # use known credentials or empty credentials for unknown protocol
-        return (
-            self.PROTOCOL_CREDENTIALS.get(self.protocol)
-            or Optional[CredentialsConfiguration]  # type: ignore[return-value]
-        )
+        # resolvers are not inherited by configspec
+        return self.credentials_type_for_protocol(self.protocol)
 
     def on_resolved(self) -> None:
         # Validate layout and show unused placeholders
@@ -265,6 +265,41 @@ def test_gcp_service_credentials_resolved_from_native_representation(environment
     resolve_configuration(gcpc, accept_partial=False)
 
 
+def test_gcp_default_credentials_cached(environment: Any, mocker) -> None:
+    pytest.importorskip("google.auth")
+    from dlt.common.configuration.specs.gcp_credentials import GcpDefaultCredentials
+
+    mocker.patch.object(GcpDefaultCredentials, "_LAST_FAILED_DEFAULT", 0.0)
+    mocker.patch.object(GcpDefaultCredentials, "_LAST_FOUND_DEFAULT", (0.0, (), None, None))
+    native_credentials = object()
+    default_mock = mocker.patch(
+        "google.auth.default", return_value=(native_credentials, "level-dragon-333019")
+    )
+    assert GcpDefaultCredentials._get_default_credentials() == (
+        native_credentials,
+        "level-dragon-333019",
+    )
+    # found credentials are reused
+    assert GcpDefaultCredentials._get_default_credentials()[0] is native_credentials
+    assert default_mock.call_count == 1
+    # but not when credentials file changes
+    environment["GOOGLE_APPLICATION_CREDENTIALS"] = "service.json"
+    assert GcpDefaultCredentials._get_default_credentials()[0] is native_credentials
+    assert default_mock.call_count == 2
+    # or project id
+    default_mock.return_value = (native_credentials, "other-project")
+    environment["GOOGLE_CLOUD_PROJECT"] = "other-project"
+    assert GcpDefaultCredentials._get_default_credentials()[1] == "other-project"
+    assert default_mock.call_count == 3
+    # or gcloud config folder
+    environment["CLOUDSDK_CONFIG"] = "/gcloud"
+    assert GcpDefaultCredentials._get_default_credentials()[0] is native_credentials
+    assert default_mock.call_count == 4
+    # or cache expired
+    assert GcpDefaultCredentials._get_default_credentials(cache_ttl_s=0)[0] is native_credentials
+    assert default_mock.call_count == 5
+
+
 def test_gcp_oauth_credentials_native_representation(environment) -> None:
     with pytest.raises(InvalidGoogleNativeCredentialsType):
         GcpOAuthCredentials().parse_native_representation(1)
@@ -15,34 +15,34 @@ from tests.common.runners.utils import (
     _TestRunnableWorker,
     ALL_METHODS,
     mp_method_auto,
+    process_pool,
+    thread_pool,
 )
 
 
-@pytest.mark.parametrize("method", ALL_METHODS)
-def test_runnable_process_pool(method: str) -> None:
+WORKER_CONFIG = SchemaStorageConfiguration(import_schema_path="test_schema_path")
+
+
+def test_runnable_process_pool(process_pool: ProcessPoolExecutor) -> None:
     # 4 tasks
     r = _TestRunnableWorker(4)
-    # create 4 workers
-    with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context(method)) as p:
-        rv = r._run(p)
-        p.shutdown()
+    # on 4 workers
+    rv = r._run(process_pool)
     assert len(rv) == 4
     assert [v[0] for v in rv] == list(range(4))
     # must contain 4 different pids (coming from 4 worker processes)
     assert len(set(v[1] for v in rv)) == 4
 
 
-def test_runnable_thread_pool() -> None:
+def test_runnable_thread_pool(thread_pool: ThreadPoolExecutor) -> None:
     r = _TestRunnableWorkerMethod(4)
-    with ThreadPoolExecutor(4) as p:
-        rv = r._run(p)
-        p.shutdown()
-        assert len(rv) == 4
-        assert [v[0] for v in rv] == list(range(4))
-        # must contain 1 pid (all in single process)
-        assert len(set(v[1] for v in rv)) == 1
-        # must contain one uniq_id coming from forked instance
-        assert len(set(v[1] for v in rv)) == 1
+    rv = r._run(thread_pool)
+    assert len(rv) == 4
+    assert [v[0] for v in rv] == list(range(4))
+    # must contain 1 pid (all in single process)
+    assert len(set(v[1] for v in rv)) == 1
+    # must contain one uniq_id coming from forked instance
+    assert len(set(v[1] for v in rv)) == 1
 
 
 def test_runnable_direct_worker_call() -> None:
@@ -53,6 +53,7 @@ def test_runnable_direct_worker_call() -> None:
 
 @pytest.mark.parametrize("method", ALL_METHODS)
 def test_process_worker_started_early(method: str) -> None:
+    # needs a fresh pool: checks the order in which pool and runnable are created
     with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context(method)) as p:
         r = _TestRunnableWorkerMethod(4)
         if method == "spawn":
@@ -77,16 +78,12 @@ def test_weak_pool_ref() -> None:
         r = wref[rid]
 
 
-@pytest.mark.parametrize("method", ALL_METHODS)
-def test_configuredworker(method: str) -> None:
+def test_configuredworker(process_pool: ProcessPoolExecutor) -> None:
     # call worker method with CONFIG values that should be restored into CONFIG type
-    config = SchemaStorageConfiguration()
-    config["import_schema_path"] = "test_schema_path"
-    _worker_1(config, "PX1", par2="PX2")
+    _worker_1(WORKER_CONFIG, "PX1", par2="PX2")
 
-    # must also work across process boundary
-    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context(method)) as p:
-        p.map(_worker_1, *zip(*[(config, "PX1", "PX2")]))
+    # must also work across process boundary: config is pickled for spawn and fork workers alike
+    list(process_pool.map(_worker_1, *zip(*[(WORKER_CONFIG, "PX1", "PX2")])))
 
 
 def _worker_1(CONFIG: SchemaStorageConfiguration, par1: str, par2: str = "DEFAULT") -> None:
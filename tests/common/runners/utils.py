@@ -3,7 +3,7 @@ import pytest
 import multiprocessing
 from time import sleep
 from typing import Iterator, Tuple, Optional, Any, List
-from concurrent.futures import Executor
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
 from dlt.common import logger
 from dlt.common.runners import TRunMetrics, Runnable, workermethod
@@ -20,6 +20,21 @@ def mp_method_auto() -> Iterator[None]:
     multiprocessing.set_start_method(method, force=True)
 
 
+@pytest.fixture(scope="module", params=sorted(ALL_METHODS))
+def process_pool(request: pytest.FixtureRequest) -> Iterator[ProcessPoolExecutor]:
+    """Process pool with 4 workers for each start method, shared by tests in a module to not start
+    worker processes for each test. Tests that depend on pool start order must create own pool.
+    """
+    with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context(request.param)) as p:
+        yield p
+
+
+@pytest.fixture(scope="module")
+def thread_pool() -> Iterator[ThreadPoolExecutor]:
+    with ThreadPoolExecutor(4) as p:
+        yield p
+
+
 class _TestRunnableWorkerMethod(Runnable[Executor]):
     rv: List[Tuple[int, str, int]]
 
@@ -1,14 +1,26 @@
+import errno
 import gzip
 import os
+import shutil
 import stat
 import pytest
 from pathlib import Path
 from typing import cast, TextIO
 
+from dlt.common.storages.exceptions import (
+    PreviousContentMismatchException,
+    WriteCorruptionException,
+)
 from dlt.common.storages.file_storage import FileStorage
 from dlt.common.utils import encoding_for_mode, set_working_dir, uniq_id
 
-from tests.utils import TEST_STORAGE_ROOT, autouse_test_storage, test_storage, skipifnotwindows
+from tests.utils import (
+    TEST_STORAGE_ROOT,
+    autouse_test_storage,
+    test_storage,
+    skipifnotwindows,
+    skipifwindows,
+)
 
 
 def test_storage_init(test_storage: FileStorage) -> None:
@@ -59,6 +71,21 @@ def test_make_full_path(test_storage: FileStorage) -> None:
     assert test_storage.make_full_path_safe(".") == test_storage.storage_path
 
 
+def test_make_full_path_join(test_storage: FileStorage) -> None:
+    # make full path is equivalent to os.path.join with storage root
+    for path in (
+        os.path.join("dir", "to", "file"),
+        "file",
+        "",
+        ".",
+        os.path.join("..", "file"),
+        os.path.join("dir", ""),
+        os.path.abspath("file"),
+        "C:file",
+    ):
+        assert test_storage.make_full_path(path) == os.path.join(test_storage.storage_path, path)
+
+
 def test_in_storage(test_storage: FileStorage) -> None:
     # always relative to storage root
     assert test_storage.is_path_in_storage("a/b/c") is True
@@ -75,6 +102,26 @@ def test_in_storage(test_storage: FileStorage) -> None:
         )
         is True
     )
+    # sibling folder sharing a name prefix with storage root
+    assert test_storage.is_path_in_storage(test_storage.storage_path + "_sibling") is False
+    assert test_storage.is_path_in_storage(f"../{TEST_STORAGE_ROOT}_sibling/a") is False
+
+
+@skipifwindows
+def test_in_storage_symlinks(test_storage: FileStorage, tmp_path: Path) -> None:
+    outside_path = str(tmp_path)
+    test_storage.create_folder("a")
+    os.symlink(outside_path, test_storage.make_full_path("a/out"))
+    os.symlink(test_storage.make_full_path("a"), test_storage.make_full_path("in"))
+    # symlinks below storage root are resolved
+    assert test_storage.is_path_in_storage("a/out") is False
+    assert test_storage.is_path_in_storage("a/out/b/c") is False
+    assert test_storage.is_path_in_storage("in/b/c") is True
+    assert test_storage.is_path_in_storage("in/out/b") is False
+    # symlinks outside of storage root pointing into it
+    os.symlink(test_storage.make_full_path("a"), os.path.join(outside_path, "to_storage"))
+    assert test_storage.is_path_in_storage(os.path.join(outside_path, "to_storage")) is True
+    assert test_storage.is_path_in_storage(os.path.join(outside_path, "b")) is False
 
 
 def test_from_wd_to_relative_path(test_storage: FileStorage) -> None:
@@ -118,6 +165,132 @@ def test_hard_links(test_storage: FileStorage) -> None:
     assert test_storage.load("link.txt") == content * 3
 
 
+def test_list_folder(test_storage: FileStorage) -> None:
+    test_storage.create_folder("a/b")
+    test_storage.create_folder("a/c")
+    test_storage.save("a/f1.txt", "f1")
+    test_storage.save("a/f2.txt", "f2")
+    assert sorted(test_storage.list_folder_files("a")) == [
+        os.path.join("a", "f1.txt"),
+        os.path.join("a", "f2.txt"),
+    ]
+    assert sorted(test_storage.list_folder_files("a/", to_root=True)) == [
+        os.path.join("a", "f1.txt"),
+        os.path.join("a", "f2.txt"),
+    ]
+    assert sorted(test_storage.list_folder_files("a", to_root=False)) == ["f1.txt", "f2.txt"]
+    assert sorted(test_storage.list_folder_dirs("a")) == [
+        os.path.join("a", "b"),
+        os.path.join("a", "c"),
+    ]
+    assert sorted(test_storage.list_folder_dirs("a", to_root=False)) == ["b", "c"]
+    # storage root
+    assert test_storage.list_folder_files("") == []
+    assert test_storage.list_folder_dirs("") == ["a"]
+    assert test_storage.list_folder_dirs(".") == [os.path.join(".", "a")]
+
+
+@pytest.mark.parametrize("avoids_symlink_attacks", (True, False))
+def test_delete(test_storage: FileStorage, avoids_symlink_attacks: bool, monkeypatch) -> None:
+    # walk folder descriptors or use shutil.rmtree
+    monkeypatch.setattr(shutil.rmtree, "avoids_symlink_attacks", avoids_symlink_attacks)
+    test_storage.create_folder("a/b")
+    test_storage.save("a/file.txt", "content")
+    test_storage.save("a/b/file.txt", "content")
+    # files
+    with pytest.raises(FileNotFoundError):
+        test_storage.delete("a/missing.txt")
+    with pytest.raises(FileNotFoundError):
+        test_storage.delete("a/b")
+    test_storage.delete("a/file.txt")
+    assert not test_storage.has_file("a/file.txt")
+    # folders
+    for recursively in (True, False):
+        with pytest.raises(NotADirectoryError):
+            test_storage.delete_folder("a/missing", recursively=recursively)
+        with pytest.raises(NotADirectoryError):
+            test_storage.delete_folder("a/b/file.txt", recursively=recursively)
+    # files are not deleted when read only files are deleted in folders
+    with pytest.raises(NotADirectoryError):
+        test_storage.delete_folder("a/b/file.txt", recursively=True, delete_ro=True)
+    assert test_storage.has_file("a/b/file.txt")
+    with pytest.raises(OSError):
+        test_storage.delete_folder("a/b")
+    test_storage.delete_folder("a", recursively=True)
+    assert not test_storage.has_folder("a")
+    test_storage.create_folder("empty")
+    test_storage.delete_folder("empty")
+    assert not test_storage.has_folder("empty")
+
+
+@skipifwindows
+def test_delete_folder_recursively(test_storage: FileStorage, tmp_path: Path) -> None:
+    outside_file = tmp_path / "outside.txt"
+    outside_file.write_text("outside", encoding="utf-8")
+    for idx in range(3):
+        test_storage.create_folder(f"tree/{idx}/nested/empty")
+        for f_idx in range(5):
+            test_storage.save(f"tree/{idx}/nested/file_{f_idx}.txt", "content")
+    # symlinks are removed, not followed
+    os.symlink(tmp_path, test_storage.make_full_path("tree/0/to_folder"))
+    os.symlink(outside_file, test_storage.make_full_path("tree/1/to_file"))
+    # root may not be a symlink
+    os.symlink(test_storage.make_full_path("tree"), test_storage.make_full_path("link"))
+    with pytest.raises(OSError):
+        test_storage.delete_folder("link", recursively=True)
+    assert test_storage.has_folder("tree/0/nested")
+
+    test_storage.delete_folder("tree", recursively=True)
+    assert not test_storage.has_folder("tree")
+    assert outside_file.read_text(encoding="utf-8") == "outside"
+
+    # missing root raises
+    with pytest.raises(FileNotFoundError):
+        FileStorage.rmtree(test_storage.make_full_path("tree"))
+
+
+@skipifwindows
+def test_delete_folder_swapped_with_symlink(
+    test_storage: FileStorage, tmp_path: Path, monkeypatch
+) -> None:
+    outside_file = tmp_path / "outside.txt"
+    outside_file.write_text("outside", encoding="utf-8")
+    test_storage.create_folder("tree/swapped")
+    test_storage.save("tree/swapped/file.txt", "content")
+    swapped_path = test_storage.make_full_path("tree/swapped")
+    scandir = os.scandir
+
+    class _SwapAfterListing:
+        """Replaces folder with symlink after it was listed as a folder but before it is opened"""
+
+        def __init__(self, path):
+            self.entries = scandir(path)
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            entry = next(self.entries)
+            if entry.name == "swapped" and entry.is_dir(follow_symlinks=False):
+                os.rename(swapped_path, swapped_path + ".moved")
+                os.symlink(tmp_path, swapped_path)
+            return entry
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.close()
+
+        def close(self):
+            self.entries.close()
+
+    monkeypatch.setattr(os, "scandir", _SwapAfterListing)
+    with pytest.raises(OSError):
+        FileStorage.rmtree(test_storage.make_full_path("tree"))
+    assert outside_file.read_text(encoding="utf-8") == "outside"
+
+
 def test_validate_file_name_component() -> None:
     # no dots
     with pytest.raises(ValueError):
@@ -129,7 +302,26 @@ def test_validate_file_name_component() -> None:
     with pytest.raises(ValueError):
         FileStorage.validate_file_name_component("a\\b")
 
+    # no reserved names
+    with pytest.raises(ValueError):
+        FileStorage.validate_file_name_component("com1")
+    with pytest.raises(ValueError):
+        FileStorage.validate_file_name_component("CLOCK$")
+    # no control characters and leading or trailing spaces
+    with pytest.raises(ValueError):
+        FileStorage.validate_file_name_component("a\tb")
+    with pytest.raises(ValueError):
+        FileStorage.validate_file_name_component(" ab")
+    with pytest.raises(ValueError):
+        FileStorage.validate_file_name_component("ab ")
+    # no empty names
+    with pytest.raises(ValueError):
+        FileStorage.validate_file_name_component("")
+
     FileStorage.validate_file_name_component("BAN__ANA is allowed")
+    FileStorage.validate_file_name_component("com10")
+    # length is not validated
+    FileStorage.validate_file_name_component("a" * 300)
 
 
 @pytest.mark.parametrize("action", ("rename_tree_files", "rename_tree", "atomic_rename"))
@@ -197,6 +389,237 @@ def test_save_atomic_encode() -> None:
         assert f.read() == bstr
 
 
+def test_save_atomic_durable(monkeypatch) -> None:
+    fsync = os.fsync
+    fsync_folder = FileStorage.fsync_folder
+    synced_files = []
+    synced_folders = []
+
+    def _fsync(fd: int) -> None:
+        synced_files.append(fd)
+        fsync(fd)
+
+    def _fsync_folder(folder_path: str) -> None:
+        synced_folders.append(folder_path)
+        fsync_folder(folder_path)
+
+    monkeypatch.setattr(os, "fsync", _fsync)
+    monkeypatch.setattr(FileStorage, "fsync_folder", staticmethod(_fsync_folder))
+    storage = FileStorage(TEST_STORAGE_ROOT, makedirs=True)
+    storage.create_folder("nested")
+    for durable in (True, False):
+        synced_files.clear()
+        synced_folders.clear()
+        dest_path = FileStorage.save_atomic(
+            TEST_STORAGE_ROOT, "nested/file.txt", f"durable={durable}", durable=durable
+        )
+        assert dest_path == os.path.join(TEST_STORAGE_ROOT, "nested", "file.txt")
+        assert storage.load("nested/file.txt") == f"durable={durable}"
+        assert bool(synced_files) is durable
+        assert synced_folders == ([os.path.dirname(dest_path)] if durable else [])
+        # instance save passes durable through
+        synced_files.clear()
+        synced_folders.clear()
+        storage.save("nested/file.txt", f"save durable={durable}", durable=durable)
+        assert storage.load("nested/file.txt") == f"save durable={durable}"
+        assert bool(synced_files) is durable
+        assert bool(synced_folders) is durable
+    # no temp files left behind
+    assert storage.list_folder_files("nested", to_root=False) == ["file.txt"]
+    assert storage.list_folder_files(".", to_root=False) == []
+
+
+def test_save_atomic_verify(monkeypatch) -> None:
+    storage = FileStorage(TEST_STORAGE_ROOT, makedirs=True)
+    tstr = "line'ऄअआइ'\nline 2\n"
+    dest_path = FileStorage.save_atomic(TEST_STORAGE_ROOT, "file.txt", tstr, verify=True)
+    assert storage.load("file.txt") == tstr
+    bstr = b"axa\0x0\0x0"
+    FileStorage.save_atomic(TEST_STORAGE_ROOT, "file.bin", bstr, file_type="b", verify=True)
+    prev_sha256 = FileStorage.file_sha256(dest_path)
+
+    # conditional write on previous content
+    FileStorage.save_atomic(TEST_STORAGE_ROOT, "file.txt", "new", expected_prev_sha256=prev_sha256)
+    assert storage.load("file.txt") == "new"
+    with pytest.raises(PreviousContentMismatchException) as prev_ex:
+        FileStorage.save_atomic(
+            TEST_STORAGE_ROOT, "file.txt", "newer", expected_prev_sha256=prev_sha256
+        )
+    assert prev_ex.value.actual_sha256 == FileStorage.file_sha256(dest_path)
+    assert storage.load("file.txt") == "new"
+    # missing file does not match
+    with pytest.raises(PreviousContentMismatchException) as prev_ex:
+        FileStorage.save_atomic(
+            TEST_STORAGE_ROOT, "missing.txt", "newer", expected_prev_sha256=prev_sha256
+        )
+    assert prev_ex.value.actual_sha256 is None
+
+    # simulate corrupted write
+    monkeypatch.setattr(FileStorage, "file_sha256", staticmethod(lambda path: "corrupted"))
+    with pytest.raises(WriteCorruptionException):
+        FileStorage.save_atomic(TEST_STORAGE_ROOT, "file.txt", "corrupted", verify=True)
+    assert storage.load("file.txt") == "new"
+    # temp file removed
+    assert sorted(storage.list_folder_files(".", to_root=False)) == ["file.bin", "file.txt"]
+
+
+@pytest.mark.parametrize("use_o_tmpfile", (True, False))
+def test_save_atomic_small_files(use_o_tmpfile: bool, monkeypatch) -> None:
+    if use_o_tmpfile and not hasattr(os, "O_TMPFILE"):
+        pytest.skip("O_TMPFILE not supported")
+    monkeypatch.setattr(FileStorage, "_use_o_tmpfile", use_o_tmpfile)
+    storage = FileStorage(TEST_STORAGE_ROOT, makedirs=True)
+    storage.create_folder("nested")
+    tstr = "data'ऄअआइ''ईउऊऋऌऍऎए');"
+    FileStorage.save_atomic(TEST_STORAGE_ROOT, "nested/file.txt", tstr)
+    assert storage.load("nested/file.txt") == tstr
+    # overwrite existing
+    FileStorage.save_atomic(TEST_STORAGE_ROOT, "nested/file.txt", tstr * 2, durable=False)
+    assert storage.load("nested/file.txt") == tstr * 2
+    bstr = b"axa\0x0\0x0"
+    FileStorage.save_atomic(TEST_STORAGE_ROOT, "file.bin", bstr, file_type="b")
+    assert FileStorage(TEST_STORAGE_ROOT, file_type="b").load("file.bin") == bstr
+    # file permissions do not depend on the write method
+    if os.name != "nt":
+        assert stat.S_IMODE(os.stat(storage.make_full_path("file.bin")).st_mode) == 0o600
+    # no temp files left behind
+    assert storage.list_folder_files("nested", to_root=False) == ["file.txt"]
+    assert storage.list_folder_files(".", to_root=False) == ["file.bin"]
+
+
+@skipifwindows
+def test_save_atomic_tmpfile_link(monkeypatch) -> None:
+    if not hasattr(os, "O_TMPFILE"):
+        pytest.skip("O_TMPFILE not supported")
+    link = os.link
+    linked = []
+
+    def _link_from_proc(src, dst, *args, **kwargs):
+        # emulate links from /proc where file systems or sandboxes do not permit them
+        if not src.startswith("/proc/self/fd/"):
+            return link(src, dst, *args, **kwargs)
+        with open(src, "rb") as f_src:
+            data = f_src.read()
+        with open(dst, "xb") as f_dst:
+            f_dst.write(data)
+        os.chmod(dst, 0o600)
+        linked.append(dst)
+
+    monkeypatch.setattr(os, "link", _link_from_proc)
+    monkeypatch.setattr(FileStorage, "_use_o_tmpfile", True)
+    storage = FileStorage(TEST_STORAGE_ROOT, makedirs=True)
+    FileStorage.save_atomic(TEST_STORAGE_ROOT, "file.txt", "first")
+    assert linked == [os.path.join(TEST_STORAGE_ROOT, "file.txt")]
+    # existing file replaced via temp name
+    for exchange in (False, True):
+        FileStorage.save_atomic(
+            TEST_STORAGE_ROOT, "file.txt", f"next {exchange}", exchange=exchange
+        )
+        assert storage.load("file.txt") == f"next {exchange}"
+    assert len(linked) == 3
+    assert FileStorage._use_o_tmpfile is True
+    assert storage.list_folder_files(".", to_root=False) == ["file.txt"]
+
+
+@skipifwindows
+def test_save_atomic_tmpfile_write_error(monkeypatch) -> None:
+    if not hasattr(os, "O_TMPFILE"):
+        pytest.skip("O_TMPFILE not supported")
+
+    def _no_space(fd, data):
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+    monkeypatch.setattr(os, "write", _no_space)
+    monkeypatch.setattr(FileStorage, "_use_o_tmpfile", True)
+    storage = FileStorage(TEST_STORAGE_ROOT, makedirs=True)
+    with pytest.raises(OSError) as ex:
+        FileStorage.save_atomic(TEST_STORAGE_ROOT, "file.txt", "data")
+    assert ex.value.errno == errno.ENOSPC
+    # write errors do not disable O_TMPFILE and are not retried
+    assert FileStorage._use_o_tmpfile is True
+    assert storage.list_folder_files(".", to_root=False) == []
+
+
+@pytest.mark.parametrize("use_rename_exchange", (True, False))
+def test_save_atomic_exchange(use_rename_exchange: bool, monkeypatch) -> None:
+    monkeypatch.setattr(FileStorage, "_use_rename_exchange", use_rename_exchange)
+    storage = FileStorage(TEST_STORAGE_ROOT, makedirs=True)
+    storage.create_folder("nested")
+    # destination does not exist
+    FileStorage.save_atomic(TEST_STORAGE_ROOT, "nested/file.txt", "first", exchange=True)
+    assert storage.load("nested/file.txt") == "first"
+    # swap with existing
+    for durable in (True, False):
+        FileStorage.save_atomic(
+            TEST_STORAGE_ROOT, "nested/file.txt", f"next {durable}", durable=durable, exchange=True
+        )
+        assert storage.load("nested/file.txt") == f"next {durable}"
+    # previous content removed
+    assert storage.list_folder_files("nested", to_root=False) == ["file.txt"]
+    assert storage.list_folder_files(".", to_root=False) == []
+    # folders are never swapped
+    storage.create_folder("nested/sub")
+    storage.save("nested/sub/x", "x")
+    with pytest.raises(OSError):
+        FileStorage.save_atomic(TEST_STORAGE_ROOT, "nested/sub", "data", exchange=True)
+    assert storage.load("nested/sub/x") == "x"
+    assert storage.list_folder_dirs("nested", to_root=False) == ["sub"]
+    assert storage.list_folder_files("nested", to_root=False) == ["file.txt"]
+    assert storage.list_folder_dirs(".", to_root=False) == ["nested"]
+    assert storage.list_folder_files(".", to_root=False) == []
+
+
+def test_save_many(test_storage: FileStorage) -> None:
+    test_storage.create_folder("nested")
+    items = [(f"nested/file_{idx}.txt", f"content {idx}") for idx in range(20)]
+    paths = test_storage.save_many(items)
+    assert paths == [test_storage.make_full_path(path) for path, _ in items]
+    for path, content in items:
+        assert test_storage.load(path) == content
+    # single item and empty
+    assert test_storage.save_many([("single.txt", "single")], durable=False) == [
+        test_storage.make_full_path("single.txt")
+    ]
+    assert test_storage.load("single.txt") == "single"
+    assert test_storage.save_many([]) == []
+    # failed write raises
+    with pytest.raises(FileNotFoundError):
+        test_storage.save_many([("ok.txt", "ok"), ("missing/file.txt", "missing")])
+    assert test_storage.load("ok.txt") == "ok"
+
+
+def test_load_iter() -> None:
+    tstr = "data'ऄअआइ''ईउऊऋऌऍऎए');\n" * 100
+    storage = FileStorage(TEST_STORAGE_ROOT, makedirs=True)
+    storage.save("file.txt", tstr)
+    chunks = list(storage.load_iter("file.txt", chunk_size=64))
+    assert all(len(chunk) <= 64 for chunk in chunks)
+    assert "".join(chunks) == tstr == storage.load("file.txt")
+    assert list(storage.load_iter("file.txt")) == [tstr]
+
+    bstr = b"axa\0x0\0x0" * 100
+    storage = FileStorage(TEST_STORAGE_ROOT, file_type="b")
+    storage.save("file.bin", bstr)
+    assert b"".join(storage.load_iter("file.bin", chunk_size=7)) == bstr
+    storage.save("empty.bin", b"")
+    assert list(storage.load_iter("empty.bin")) == []
+
+
+def test_open_temp() -> None:
+    storage = FileStorage(TEST_STORAGE_ROOT, makedirs=True)
+    with storage.open_temp() as f:
+        assert cast(TextIO, f).encoding == "utf-8"
+        f.write("text")
+    assert storage.load(os.path.basename(f.name)) == "text"
+    with storage.open_temp(delete=True, file_type="b") as f:
+        assert "b" in f.mode
+        f.write(b"bin")
+    assert not os.path.exists(f.name)
+    storage = FileStorage(TEST_STORAGE_ROOT, file_type="b")
+    with storage.open_temp(delete=True) as f:
+        assert "b" in f.mode
+
+
 def test_open_compressed() -> None:
     tstr = "dataisfunindeed"
     storage = FileStorage(TEST_STORAGE_ROOT)
@@ -268,3 +691,60 @@ def test_hard_link_fallback() -> None:
     os.unlink("/run/lock/dlt.r")
     assert storage.load("file.b.2") == b"data"
     storage.delete("file.b.2")
+
+
+def test_clone_hard(test_storage: FileStorage, monkeypatch) -> None:
+    # may be disabled when file system does not support reflinks
+    monkeypatch.setattr(FileStorage, "_use_reflink", FileStorage._use_reflink)
+    test_storage.save("file.txt", "data")
+    test_storage.clone_hard("file.txt", "file.txt.2")
+    assert test_storage.load("file.txt.2") == "data"
+    test_storage.delete("file.txt")
+    assert test_storage.load("file.txt.2") == "data"
+    # existing destination is replaced by fallback copy
+    test_storage.save("file.txt", "new data")
+    test_storage.clone_hard("file.txt", "file.txt.2")
+    assert test_storage.load("file.txt.2") == "new data"
+    # missing source
+    with pytest.raises(FileNotFoundError):
+        test_storage.clone_hard("missing.txt", "file.txt.3")
+    assert not test_storage.has_file("file.txt.3")
+
+
+@skipifwindows
+def test_clone_hard_reflink_not_supported(test_storage: FileStorage, monkeypatch) -> None:
+    import fcntl
+
+    calls = []
+
+    def _ioctl(fd: int, request: int, arg: int) -> None:
+        calls.append(request)
+        raise OSError(errno.EOPNOTSUPP, os.strerror(errno.EOPNOTSUPP))
+
+    monkeypatch.setattr(fcntl, "ioctl", _ioctl)
+    monkeypatch.setattr(FileStorage, "_use_reflink", True)
+    test_storage.save("file.txt", "data")
+    test_storage.clone_hard("file.txt", "file.txt.2")
+    assert test_storage.load("file.txt.2") == "data"
+    assert len(calls) == 1
+    # reflinks disabled after first failure
+    assert FileStorage._use_reflink is False
+    test_storage.clone_hard("file.txt", "file.txt.3")
+    assert test_storage.load("file.txt.3") == "data"
+    assert len(calls) == 1
+
+
+@skipifwindows
+def test_clone_hard_cross_device(test_storage: FileStorage, monkeypatch) -> None:
+    import fcntl
+
+    def _ioctl(fd: int, request: int, arg: int) -> None:
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(fcntl, "ioctl", _ioctl)
+    monkeypatch.setattr(FileStorage, "_use_reflink", True)
+    test_storage.save("file.txt", "data")
+    test_storage.clone_hard("file.txt", "file.txt.2")
+    assert test_storage.load("file.txt.2") == "data"
+    # cross device clone does not disable reflinks
+    assert FileStorage._use_reflink is True
@@ -17,6 +17,18 @@ UNC_LOCAL_EXT_PATH = r"\\?\UNC\localhost\c$\tests\common\test.csv"
 UNC_WSL_PATH = r"\\wsl.localhost\Ubuntu-18.04\home\rudolfix\ .dlt"
 
 
+def test_protocol_follows_bucket_url() -> None:
+    c = FilesystemConfiguration("s3://bucket/path")
+    assert c.protocol == "s3"
+    # protocol is not stale when bucket_url changes
+    c.bucket_url = "gs://bucket/path"
+    assert c.protocol == "gs"
+    c.bucket_url = "_storage/path"
+    assert c.protocol == "file"
+    c.bucket_url = "AZ://container/path"
+    assert c.protocol == "az"
+
+
 @skipifnotwindows
 @pytest.mark.parametrize(
     "bucket_url,file_url",